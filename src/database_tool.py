@@ -121,8 +121,13 @@ class EmployeeDatabase:
             - annual_quota_hours
         """
         conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        try:
+            return self._read_balance(conn.cursor(), employee_id, leave_type)
+        finally:
+            conn.close()
+    
+    def _read_balance(self, cursor, employee_id: str, leave_type: str) -> Dict:
+        """Compute the balance dictionary using an open cursor (see get_remaining_balance)."""
         # Check which schema columns exist
         cursor.execute("PRAGMA table_info(employees)")
         columns = [row[1] for row in cursor.fetchall()]
@@ -149,7 +154,6 @@ class EmployeeDatabase:
                 """, (employee_id,))
             
             result = cursor.fetchone()
-            conn.close()
             
             if not result:
                 return {
@@ -190,7 +194,6 @@ class EmployeeDatabase:
             """, (employee_id,))
             
             result = cursor.fetchone()
-            conn.close()
             
             if not result:
                 return {
@@ -481,8 +484,13 @@ class EmployeeDatabase:
     
     def record_leave_request(self, employee_id: str, leave_type: str, 
                            start_date: date, end_date: date, 
-                           days_requested: float, status: str = "approved"):
-        """Record a leave request in the database. Reduces balance when approved."""
+                           days_requested: float, status: str = "approved") -> Dict:
+        """Record a leave request in the database. Reduces balance when approved.
+        
+        Returns:
+            The employee's balance after the update (same shape as
+            get_remaining_balance), read on the same connection.
+        """
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
@@ -499,8 +507,10 @@ class EmployeeDatabase:
         if status == "approved":
             self._update_employee_balance(cursor, employee_id, leave_type, days_requested)
         
+        balance = self._read_balance(cursor, employee_id, leave_type)
         conn.commit()
         conn.close()
+        return balance
     
     def get_leave_history(self, employee_id: Optional[str] = None, limit: int = 20) -> List[Dict]:
         """Get leave request history, optionally filtered by employee_id"""
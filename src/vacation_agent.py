@@ -67,15 +67,11 @@ class VacationAgent:
                 employee_id, days_requested, leave_type
             )
             
-            # Record the approved request
-            self.db.record_leave_request(
+            # Record the approved request (returns the updated balance)
+            balance_info = self.db.record_leave_request(
                 employee_id, leave_type, start_date, end_date, days_requested, "approved"
             )
             
-            # Fetch updated balance
-            updated_balance_info = self.db.get_remaining_balance(employee_id, leave_type)
-            balance_info = updated_balance_info
-            
             # Generate manager auto-approval response
             response = {
                 "status": "approved",
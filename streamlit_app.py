@@ -4,20 +4,386 @@ Professional Streamlit dashboard for employee leave requests
 """
 
 import streamlit as st
+import streamlit.components.v1 as components
+import functools
+import gc
+import html
+import inspect
+import json
 import os
+import re
 import sqlite3
-import pandas as pd
+import string
+from collections import Counter
+import numpy as np
 from datetime import date, timedelta, datetime
 from pathlib import Path
-from dotenv import load_dotenv
 
-# Load environment variables
-env_path = Path(__file__).parent / '.env'
-load_dotenv(dotenv_path=env_path)
+
+# Load environment variables once per process (Streamlit reruns this script on every interaction)
+@st.cache_resource(show_spinner=False)
+def _load_env():
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=Path(__file__).parent / '.env')
+    return True
+
+_load_env()
 
 from src.vacation_agent import VacationAgent
 from src.database_tool import EmployeeDatabase
 
+
+# Sample roster shown when the employee database can't be read
+FALLBACK_EMPLOYEES = (
+    ("EMP001", "John Smith", "Engineering", "Developer", 14, 112.0),
+    ("EMP002", "Jane Doe", "Marketing", "Specialist", 15, 120.0),
+    ("EMP003", "Bob Johnson", "Finance", "Analyst", 10, 80.0),
+    ("EMP004", "Alice Williams", "HR", "Coordinator", 10, 80.0),
+)
+
+# Analysis check status colors
+STATUS_COLORS = {
+    "PASS": "#10b981",
+    "FAIL": "#ef4444",
+    "WARNING": "#f59e0b",
+    "INFO": "#3b82f6"
+}
+
+# Proactive option card colors by option type
+CARD_COLORS = {
+    "approve": "#10b981",
+    "reduce": "#3b82f6",
+    "delay": "#f59e0b",
+    "deny": "#ef4444",
+    "modify": "#6366f1"
+}
+
+# Processing Flow step icons and connector
+ICON_MAP = {
+    "processing": "⏳",
+    "completed": "✅",
+    "error": "❌"
+}
+FLOW_CONNECTOR_HTML = '<div class="flow-connector">↓</div>'
+
+# Employee card styles: (card_color, border_color, badge)
+EMP_CARD_STYLE = ("#f8fafc", "#4a90e2", "👤")
+MGR_CARD_STYLE = ("#fff3cd", "#ffc107", "👑")
+
+# Static Policy Highlights shown in the policy modal
+_POLICY_HIGHLIGHTS_MD = """
+- **60% Rule**: Cannot use >60% of annual allowance in single request
+- **Frequency Limits**: Max 2 long vacations (>7 days) per 60-day period
+- **Blackout Periods**: Restricted dates during fiscal quarters
+- **Notice Period**: Minimum 2-week notice for leaves >3 days
+"""
+
+# Static page footer
+_FOOTER_HTML = (
+    '<div style="text-align: center; color: #94a3b8; padding: 2rem 0;">'
+    '<strong>Corporate Vacation AI Agent</strong> | Tool → RAG Integration | Built with Streamlit<br>'
+    '<small>© 2024 Corporate Leave Management System</small>'
+    '</div>'
+)
+
+# Sent-email timestamp clock and format
+_now = datetime.now
+_FMT = "%Y-%m-%d %H:%M:%S"
+
+
+@st.cache_data(persist="disk", max_entries=2, show_spinner=False)
+def load_employee_roster(db_path: str, db_mtime: float) -> tuple:
+    """Fetch the employee roster as a tuple of rows, persisted to disk across restarts.
+
+    ``db_mtime`` is only part of the cache key: edits made outside the app
+    (populate/reset scripts) change the file's mtime and miss the cache.
+    Only the current mtime is ever hit, so ``max_entries`` evicts the stale
+    pickles those writes leave behind.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT employee_id, name, department, position, vacation_days, remaining_hours
+            FROM employees
+            ORDER BY employee_id
+        """)
+        return tuple(cursor.fetchall())
+    finally:
+        conn.close()
+
+
+_SECTION_RE = re.compile(r'\(([^)]+)\)')
+
+
+def extract_section(rule: str) -> str:
+    """Policy section cited in parentheses in a violation rule, e.g. "60% Rule (Section 2.1)"."""
+    m = _SECTION_RE.search(rule or '')
+    return m.group(1) if m else 'N/A'
+
+
+def _compact_html(fragment: str) -> str:
+    """Strip indentation and blank lines so markdown keeps an HTML fragment as one raw block."""
+    return "\n".join(line.strip() for line in fragment.splitlines() if line.strip())
+
+
+# Card templates, compacted once at import and filled with string.Template
+CHECK_CARD_TPL = string.Template(_compact_html("""
+    <div style="padding: 1rem; margin: 0.5rem 0; border-radius: 8px; 
+               border-left: 4px solid $color; background: #f8fafc;">
+        <div style="display: flex; align-items: center; gap: 0.5rem; margin-bottom: 0.5rem;">
+            <span style="font-size: 1.5rem;">$icon</span>
+            <strong style="color: $color;">$check</strong>
+            <span style="margin-left: auto; padding: 0.25rem 0.75rem; 
+                        background: $color; color: white; border-radius: 12px; 
+                        font-size: 0.75rem; font-weight: bold;">
+                $status
+            </span>
+        </div>
+        <div style="color: #64748b; font-size: 0.9rem; margin-bottom: 0.25rem;">
+            $message
+        </div>
+        <div style="color: #94a3b8; font-size: 0.85rem; font-style: italic;">
+            $details
+        </div>
+        $section
+    </div>
+"""))
+CHECK_SECTION_TPL = string.Template(
+    "<div style='color: #3b82f6; font-size: 0.8rem; margin-top: 0.25rem;'><strong>Policy:</strong> $section</div>"
+)
+VIOLATION_CARD_TPL = string.Template(_compact_html("""
+    <div style="padding: 1.5rem; margin: 1rem 0; border-radius: 12px; 
+               background: linear-gradient(135deg, #fee2e2 0%, #fecaca 100%);
+               border-left: 5px solid #ef4444;">
+        <div style="display: flex; align-items: start; gap: 1rem;">
+            <span style="font-size: 2rem;">📌</span>
+            <div style="flex: 1;">
+                <strong style="color: #dc2626; font-size: 1.1rem;">
+                    $rule
+                </strong>
+                <div style="margin-top: 0.5rem; color: #64748b;">
+                    $description
+                </div>
+                <div style="margin-top: 0.75rem; padding: 0.5rem; background: white; 
+                           border-radius: 6px; border-left: 3px solid #3b82f6;">
+                    <strong style="color: #3b82f6;">Policy Reference:</strong> 
+                    <code style="background: #f1f5f9; padding: 0.2rem 0.5rem; 
+                                border-radius: 4px; margin-left: 0.5rem;">$section</code>
+                </div>
+            </div>
+        </div>
+    </div>
+"""))
+
+
+@functools.lru_cache(maxsize=512)
+def render_check(status: str, icon: str, check: str, message: str, details: str, section: str) -> str:
+    """Request Analysis card for one check (identical checks repeat across reruns)."""
+    return CHECK_CARD_TPL.substitute(
+        color=STATUS_COLORS.get(status or "INFO", "#64748b"),
+        icon=html.escape(icon),
+        check=html.escape(check),
+        status=html.escape(status or "UNKNOWN"),
+        message=html.escape(message),
+        details=html.escape(details),
+        section=CHECK_SECTION_TPL.substitute(section=html.escape(section)) if section else "",
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def render_violation(rule: str, description: str) -> str:
+    """Conflict Resolution card for one blocking violation (violations repeat across users)."""
+    return VIOLATION_CARD_TPL.substitute(
+        rule=html.escape(rule),
+        description=html.escape(description),
+        section=html.escape(extract_section(rule)),
+    )
+
+
+@st.cache_data(show_spinner=False)
+def compute_alt_suggestions(start_iso: str, end_iso: str, days: float) -> list[dict]:
+    """Alternative date ranges offered under Option B."""
+    start_date_obj = date.fromisoformat(start_iso)
+    end_date_obj = date.fromisoformat(end_iso)
+    alt_suggestions = []
+    if days > 7:
+        # Suggest splitting into 2 parts
+        part1_days = min(7.0, days / 2)
+        part1_end = start_date_obj + timedelta(days=int(part1_days) - 1)
+        alt_suggestions.append({
+            "dates": f"{start_date_obj.strftime('%b %d')} - {part1_end.strftime('%b %d, %Y')}",
+            "days": part1_days,
+            "benefit": "Complies with max 7-day consecutive limit"
+        })
+        
+        part2_days = days - part1_days
+        part2_start = start_date_obj + timedelta(days=14)
+        part2_end = part2_start + timedelta(days=int(part2_days) - 1)
+        alt_suggestions.append({
+            "dates": f"{part2_start.strftime('%b %d')} - {part2_end.strftime('%b %d, %Y')}",
+            "days": part2_days,
+            "benefit": "2 weeks later - better team coverage"
+        })
+    else:
+        # Suggest shifting by 1 week
+        shift_start = start_date_obj + timedelta(days=7)
+        shift_end = end_date_obj + timedelta(days=7)
+        alt_suggestions.append({
+            "dates": f"{shift_start.strftime('%b %d')} - {shift_end.strftime('%b %d, %Y')}",
+            "days": days,
+            "benefit": "1 week later - better team planning"
+        })
+        # Suggest shifting by 2 weeks
+        shift_start2 = start_date_obj + timedelta(days=14)
+        shift_end2 = end_date_obj + timedelta(days=14)
+        alt_suggestions.append({
+            "dates": f"{shift_start2.strftime('%b %d')} - {shift_end2.strftime('%b %d, %Y')}",
+            "days": days,
+            "benefit": "2 weeks later - improved coverage"
+        })
+    return alt_suggestions
+
+
+@st.cache_data(show_spinner=False)
+def compute_split(start_iso: str, days: float) -> dict:
+    """Option C split: two segments two weeks apart, always with valid date ranges."""
+    start_date_obj = date.fromisoformat(start_iso)
+    part1_days = int(days / 2)  # Use integer days for clean splits
+    if part1_days < 1:
+        part1_days = 1
+    part1_end = start_date_obj + timedelta(days=part1_days - 1)  # -1 because start date is included
+    
+    part2_days = days - part1_days
+    if part2_days < 1:
+        part2_days = 1
+        part1_days = days - 1
+        part1_end = start_date_obj + timedelta(days=part1_days - 1)
+    
+    part2_start = start_date_obj + timedelta(days=14)
+    part2_end = part2_start + timedelta(days=part2_days - 1)
+    return {
+        "part1_days": part1_days,
+        "part1_dates": f"{start_date_obj.strftime('%b %d')} - {part1_end.strftime('%b %d, %Y')}",
+        "part2_days": part2_days,
+        "part2_dates": f"{part2_start.strftime('%b %d')} - {part2_end.strftime('%b %d, %Y')}",
+    }
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def render_options_html(start_iso: str, end_iso: str, start_label: str, end_label: str,
+                        days_requested: float, remaining_days: float, remaining_hours: float,
+                        all_checks_passed: bool, blocking_violations: tuple) -> dict:
+    """Build the markdown for the Option A-D panels (cached until the request changes).
+
+    ``start_label``/``end_label`` are the pre-formatted "%B %d" and
+    "%B %d, %Y" dates; ``blocking_violations`` is a tuple of
+    ``(rule, description)`` pairs so every argument is hashable.
+    """
+    # Option A: new balance if approved
+    consumed_hours = days_requested * 8.0
+    new_remaining_days = remaining_days - days_requested if remaining_days > days_requested else 0.0
+    new_remaining_hours = remaining_hours - consumed_hours if remaining_hours > consumed_hours else 0.0
+    status_icon = "✅" if all_checks_passed else "⚠️"
+    status_text = "All checks passed" if all_checks_passed else "Some warnings present"
+    option_a = "\n".join([
+        "**Option A: ✅ Approve Exactly as Requested**",
+        f"- **Status:** {status_icon} {status_text}",
+        f"- **Action:** Approve {days_requested:.1f} days from {start_label} to {end_label}",
+        f"- **New Balance:** {new_remaining_days:.1f} days ({new_remaining_hours:.1f} hours)",
+        "- **Email:** Will be sent to manager",
+    ])
+    
+    # Option B: actual alternative date suggestions
+    alt_suggestions = compute_alt_suggestions(start_iso, end_iso, days_requested)
+    option_b = "\n".join([
+        "**Option B: 🔄 Suggest Better Dates**",
+        "- **Status:** ⚠️ Alternative suggestions",
+        *[
+            f"- **Suggestion {i+1}:** {sug['dates']} ({sug['days']:.1f} days) - {sug['benefit']}"
+            for i, sug in enumerate(alt_suggestions)
+        ],
+        f"- **New Balance:** Same {days_requested:.1f} days total",
+    ])
+    
+    # Option C: split into two segments two weeks apart
+    split = compute_split(start_iso, days_requested)
+    option_c = "\n".join([
+        "**Option C: ✂️ Split Request**",
+        "- **Status:** ⚠️ For better team coverage",
+        f"- **Part 1:** {split['part1_days']} days on {split['part1_dates']}",
+        f"- **Part 2:** {split['part2_days']} days on {split['part2_dates']}",
+        "- **Benefit:** Maintains team productivity",
+    ])
+    
+    # Option D: deny with explanation, or manager override when nothing blocks
+    if blocking_violations:
+        policy_refs = ", ".join(extract_section(rule) for rule, _ in blocking_violations[:1])
+        option_d = "\n".join([
+            "**Option D: ❌ Deny with Explanation**",
+            "- **Status:** ❌ Policy violation detected",
+            *[f"- {rule}: {description}" for rule, description in blocking_violations[:2]],
+            f"- **Policy Reference:** {policy_refs}",
+            "- **Suggestion:** Please review the policy violations above and adjust your request accordingly.",
+        ])
+    else:
+        option_d = "\n".join([
+            "**Option D: ❌ Deny Anyway (Manager Override)**",
+            "- **Status:** ⚠️ Override required (no policy violations)",
+            "- **Note:** This request can be approved, but you may deny it with manager override",
+            "- **Reason:** Please provide a reason for override when denying",
+        ])
+    
+    return {"a": option_a, "b": option_b, "c": option_c, "d": option_d}
+
+
+@st.cache_data
+def _render_employee_cards(rows: tuple) -> str:
+    """Render the "View All Employees" cards as one HTML string (cached per roster)."""
+    # Flag managers in one vectorized pass instead of a startswith() per row
+    is_mgr = np.char.startswith(np.array([str(r[0]) for r in rows], dtype=str), "MGR")
+    cards = []
+    for (emp_id, emp_name, emp_dept, emp_pos, emp_vac_days, emp_rem_hrs), mgr in zip(rows, is_mgr):
+        card_color, border_color, badge = MGR_CARD_STYLE if mgr else EMP_CARD_STYLE
+        cards.append(f'''
+            <div class="employee-card" style="background: {card_color}; border-left: 3px solid {border_color}; margin: 0.25rem 0;">
+                {badge} <strong>{html.escape(str(emp_id))}</strong> - {html.escape(str(emp_name))}<br>
+                <small>📁 {html.escape(str(emp_dept))} | 💼 {html.escape(str(emp_pos))} | 📅 {emp_vac_days} days ({emp_rem_hrs} hrs)</small>
+            </div>
+            ''')
+    return "".join(cards)
+
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def _gen_email(emp_id: str, lv_type: str, s_iso: str, e_iso: str, days: float,
+               balance_key: tuple, custom_message) -> str:
+    """Employee email draft, cached so regenerating with unchanged inputs skips the LLM call.
+
+    Dates are ISO strings and ``balance_key`` is ``tuple(sorted(balance_info.items()))``
+    so every argument hashes cheaply.
+    """
+    return get_agent().generate_employee_email(
+        employee_id=emp_id,
+        leave_type=lv_type,
+        start_date=date.fromisoformat(s_iso),
+        end_date=date.fromisoformat(e_iso),
+        days_requested=days,
+        balance_info=dict(balance_key),
+        custom_message=custom_message
+    )
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _policy_explain(q: str) -> str:
+    """Policy search answer, cached so repeated queries skip the RAG retrieval."""
+    return get_agent().get_policy_explanation(q)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _balance(emp: str, lt: str) -> dict:
+    """Balance Query result; cleared alongside the roster whenever a request is recorded."""
+    return get_agent().query_balance(emp, lt)
+
 # Page configuration
 st.set_page_config(
     page_title="Corporate Vacation AI Agent",
@@ -187,18 +553,6 @@ st.markdown("""
             transform: translateX(5px);
         }
         
-        /* Enhanced email preview */
-        .email-preview {
-            padding: 1.5rem;
-            background: #f8f9fa;
-            border: 2px solid #dee2e6;
-            border-radius: 12px;
-            font-family: 'Courier New', monospace;
-            font-size: 0.9rem;
-            white-space: pre-wrap;
-            box-shadow: inset 0 2px 4px rgba(0, 0, 0, 0.05);
-        }
-        
         /* Metric cards */
         .metric-card {
             background: white;
@@ -357,23 +711,60 @@ def _init_session_state():
 
 _init_session_state()
 
-if "agent" not in st.session_state:
-    with st.spinner("Initializing AI Agent..."):
-        try:
-            st.session_state.agent = VacationAgent()
-            st.session_state.db = EmployeeDatabase()
-            if not os.path.exists("data/employee_data.db") or os.path.getsize("data/employee_data.db") == 0:
-                st.session_state.db.initialize_sample_data()
-        except Exception as e:
-            st.error(f"Error initializing agent: {str(e)}")
-            st.stop()
+# Fail fast on an outdated agent instead of retrying with a module reload mid-request
+if "is_manager" not in inspect.signature(VacationAgent.process_vacation_request).parameters:
+    st.error("VacationAgent.process_vacation_request() does not accept `is_manager`; update src/vacation_agent.py and restart the app.")
+    st.stop()
+
+@st.cache_resource(show_spinner=False)
+def get_db() -> EmployeeDatabase:
+    """Shared database tool for all sessions (created once per process).
+
+    Seeds the sample roster when the employees table is empty. Every
+    EmployeeDatabase (including the agent's) creates the file and schema on
+    construction, so the file existing says nothing about whether it has rows.
+    """
+    db = EmployeeDatabase()
+    conn = sqlite3.connect(db.db_path)
+    try:
+        needs_sample_data = conn.execute("SELECT COUNT(*) FROM employees").fetchone()[0] == 0
+    finally:
+        conn.close()
+    if needs_sample_data:
+        db.initialize_sample_data()
+    return db
+
+
+@st.cache_resource(show_spinner="Initializing AI Agent...")
+def get_agent() -> VacationAgent:
+    """Shared agent (LLM client and policy RAG index) for all sessions (created once per process)."""
+    return VacationAgent()
+
+
+try:
+    get_db()  # Before the agent, so a fresh install is seeded before anything else opens the DB
+    get_agent()
+except Exception as e:
+    st.error(f"Error initializing agent: {str(e)}")
+    st.stop()
+
+
+@st.cache_resource(show_spinner=False)
+def _freeze_startup_objects():
+    """Exempt startup objects (modules, agent, RAG index) from cyclic GC scans, once per process."""
+    gc.freeze()
+
+
+_freeze_startup_objects()
 
 # Enhanced Header
 st.markdown('<h1 class="main-header">🏢 Corporate Vacation AI Agent</h1>', unsafe_allow_html=True)
 st.markdown('<p class="sub-header">Unified AI-powered leave management system with Tool → RAG integration</p>', unsafe_allow_html=True)
 
 # Enhanced Sidebar
-with st.sidebar:
+# Runs as a fragment so typing in the directory search doesn't rerun the main area
+@st.fragment
+def _sidebar():
     # Employee Directory with search (at top)
     st.markdown('### 👥 Employee Directory')
     search_query = st.text_input("Search", placeholder="Search employee...", key="emp_search", label_visibility="collapsed")
@@ -381,27 +772,34 @@ with st.sidebar:
     
     try:
         conn_dir = sqlite3.connect("data/employee_data.db")
+        # SQLite's lower() only folds ASCII; fold with Python's str.lower so "José"/"Ökan" match as before
+        conn_dir.create_function("py_lower", 1, lambda v: str(v or "").lower(), deterministic=True)
         cur_dir = conn_dir.cursor()
-        cur_dir.execute("""
-            SELECT employee_id, name, department, COALESCE(remaining_hours, 0) as remaining_hours
-            FROM employees
-            ORDER BY employee_id
-        """)
-        dir_employees = cur_dir.fetchall()
-        conn_dir.close()
-        
         search_lower = (search_query or "").strip().lower()
         if search_lower:
-            filtered = [
-                e for e in dir_employees
-                if search_lower in (e[0] or "").lower()
-                or search_lower in (e[1] or "").lower()
-                or search_lower in (str(e[2] or "")).lower()
-            ]
+            # Filter in SQLite; escape LIKE wildcards so the match stays a plain substring search
+            escaped = search_lower.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            q = f"%{escaped}%"
+            cur_dir.execute("""
+                SELECT employee_id, name, department, COALESCE(remaining_hours, 0) as remaining_hours
+                FROM employees
+                WHERE py_lower(employee_id) LIKE ? ESCAPE '\\'
+                   OR py_lower(name) LIKE ? ESCAPE '\\'
+                   OR py_lower(department) LIKE ? ESCAPE '\\'
+                ORDER BY employee_id
+                LIMIT 20
+            """, (q, q, q))
         else:
-            filtered = dir_employees
+            cur_dir.execute("""
+                SELECT employee_id, name, department, COALESCE(remaining_hours, 0) as remaining_hours
+                FROM employees
+                ORDER BY employee_id
+                LIMIT 20
+            """)
+        filtered = cur_dir.fetchall()
+        conn_dir.close()
         
-        for emp in filtered[:20]:  # Limit to 20 for performance
+        for emp in filtered:
             emp_id, name, dept, rem_hrs = emp
             rem_days = round(rem_hrs / 8.0, 1)
             with st.expander(f"**{emp_id}** · {name}"):
@@ -433,9 +831,15 @@ with st.sidebar:
         emp_rows = cur_tbl.fetchall()
         conn_tbl.close()
         if emp_rows:
-            emp_data = [(r[0], round(r[1] / 8.0, 1)) for r in emp_rows]
-            df_emp = pd.DataFrame(emp_data, columns=["Employee ID", "Remaining Days"])
-            st.dataframe(df_emp, use_container_width=True, hide_index=True)
+            # Pass column arrays straight to st.dataframe; no DataFrame needed for two columns
+            ids_array = np.array([r[0] for r in emp_rows], dtype=object)
+            rem_days_array = np.round(np.array([r[1] for r in emp_rows], dtype=np.float32) / 8.0, 1)
+            st.dataframe(
+                {"Employee ID": ids_array, "Remaining Days": rem_days_array},
+                column_config={"Remaining Days": st.column_config.NumberColumn(format="%.1f")},
+                use_container_width=True,
+                hide_index=True
+            )
         else:
             st.caption("No employees in database. Run populate_employees.py first.")
     except Exception as ex:
@@ -447,9 +851,11 @@ with st.sidebar:
     with col1:
         if st.button("💰", use_container_width=True, help="Check Balance"):
             st.session_state.show_balance = True
+            st.rerun()  # Modals render in the main area
     with col2:
         if st.button("📄", use_container_width=True, help="View Policy"):
             st.session_state.show_policy = True
+            st.rerun()  # Modals render in the main area
     
     st.markdown("---")
     
@@ -457,37 +863,15 @@ with st.sidebar:
     st.markdown('### 👥 Employees')
     
     # Fetch all employees from database
-    FALLBACK_EMPLOYEES = [
-        ("EMP001", "John Smith", "Engineering", "Developer", 14, 112.0),
-        ("EMP002", "Jane Doe", "Marketing", "Specialist", 15, 120.0),
-        ("EMP003", "Bob Johnson", "Finance", "Analyst", 10, 80.0),
-        ("EMP004", "Alice Williams", "HR", "Coordinator", 10, 80.0),
-    ]
     try:
-        conn = sqlite3.connect("data/employee_data.db")
-        cursor = conn.cursor()
-        
-        # Get total count
-        cursor.execute("SELECT COUNT(*) FROM employees")
-        total_count = cursor.fetchone()[0]
+        db_path = get_db().db_path
+        all_employees = load_employee_roster(db_path, os.path.getmtime(db_path))
         
-        # Get department breakdown
-        cursor.execute("""
-            SELECT department, COUNT(*) as count 
-            FROM employees 
-            GROUP BY department 
-            ORDER BY department
-        """)
-        dept_counts = cursor.fetchall()
-        
-        # Get all employees with details
-        cursor.execute("""
-            SELECT employee_id, name, department, position, vacation_days, remaining_hours
-            FROM employees
-            ORDER BY employee_id
-        """)
-        all_employees = cursor.fetchall()
-        conn.close()
+        # Derive total count and department breakdown from the same rows (no extra queries)
+        total_count = len(all_employees)
+        dept_counter = Counter(emp[2] for emp in all_employees)
+        # NULL departments first, matching SQLite's ORDER BY department
+        dept_counts = sorted(dept_counter.items(), key=lambda item: (item[0] is not None, item[0] or ""))
     except Exception as e:
         st.warning(f"Could not load employees: {str(e)}")
         st.caption("Using sample data.")
@@ -501,7 +885,11 @@ with st.sidebar:
     st.markdown(f'<small style="color: #64748b;">📊 Departments: {dept_breakdown}</small>', unsafe_allow_html=True)
     st.markdown("---")
     
-    employee_options = {f"{emp[0]} - {emp[1]} ({emp[2]})": emp[0] for emp in all_employees}
+    employee_options = {}
+    emp_by_id = {}
+    for emp in all_employees:
+        employee_options[f"{emp[0]} - {emp[1]} ({emp[2]})"] = emp[0]
+        emp_by_id[emp[0]] = emp
     employee_labels = list(employee_options.keys())
     default_index = 0
     if 'selected_employee_index' in st.session_state:
@@ -519,11 +907,19 @@ with st.sidebar:
         key="employee_selector",
         help="Select an employee to view their details or submit a request"
     )
-    selected_employee_id = employee_options[selected_employee_label]
+    # An empty roster leaves the selectbox at None; keep the sidebar rendering instead of raising
+    if not employee_labels:
+        st.caption("No employees in the database yet.")
+    selected_employee_id = employee_options.get(selected_employee_label)
+    previous_employee_id = st.session_state.selected_employee_id
     st.session_state.selected_employee_id = selected_employee_id
-    st.session_state.selected_employee_index = employee_labels.index(selected_employee_label)
+    if selected_employee_label is not None:
+        st.session_state.selected_employee_index = employee_labels.index(selected_employee_label)
+    if previous_employee_id is not None and previous_employee_id != selected_employee_id:
+        # The request form and balance panel read the selection, so refresh the whole app
+        st.rerun()
     
-    selected_emp = next((e for e in all_employees if e[0] == selected_employee_id), None)
+    selected_emp = emp_by_id.get(selected_employee_id)
     if selected_emp:
         emp_id, emp_name, emp_dept, emp_pos, emp_vac_days, emp_rem_hrs = selected_emp
         st.markdown(f"""
@@ -537,17 +933,7 @@ with st.sidebar:
     st.markdown("---")
     with st.expander(f"📋 View All Employees ({total_count} total)"):
         st.markdown(f'<small style="color: #64748b;">All {total_count} employees from database</small>', unsafe_allow_html=True)
-        for emp_id, emp_name, emp_dept, emp_pos, emp_vac_days, emp_rem_hrs in all_employees:
-            is_manager = emp_id.startswith("MGR")
-            card_color = "#fff3cd" if is_manager else "#f8fafc"
-            border_color = "#ffc107" if is_manager else "#4a90e2"
-            badge = "👑" if is_manager else "👤"
-            st.markdown(f'''
-            <div class="employee-card" style="background: {card_color}; border-left: 3px solid {border_color}; margin: 0.25rem 0;">
-                {badge} <strong>{emp_id}</strong> - {emp_name}<br>
-                <small>📁 {emp_dept} | 💼 {emp_pos} | 📅 {emp_vac_days} days ({emp_rem_hrs} hrs)</small>
-            </div>
-            ''', unsafe_allow_html=True)
+        st.markdown(_render_employee_cards(all_employees), unsafe_allow_html=True)
     
     st.markdown('</div>', unsafe_allow_html=True)
     
@@ -567,6 +953,9 @@ with st.sidebar:
     """, unsafe_allow_html=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
+with st.sidebar:
+    _sidebar()
+
 # Main Content
 col1, col2 = st.columns([1.2, 1])
 
@@ -578,7 +967,7 @@ with col1:
     if show_balance and bal_employee_id:
         st.markdown("### 📊 Your Current Leave Balance")
         try:
-            balance = st.session_state.db.get_remaining_balance(bal_employee_id, "vacation")
+            balance = get_db().get_remaining_balance(bal_employee_id, "vacation")
             if "error" not in balance:
                 bal_col1, bal_col2, bal_col3 = st.columns(3)
                 with bal_col1:
@@ -675,33 +1064,13 @@ with col1:
                                 "message": "Manager leave auto-approved per policy. HR notified for tracking."
                             })
                             
-                            try:
-                                result = st.session_state.agent.process_vacation_request(
-                                    employee_id=employee_id,
-                                    leave_type=leave_type,
-                                    start_date=start_date,
-                                    end_date=end_date,
-                                    is_manager=True
-                                )
-                            except TypeError as e:
-                                if "is_manager" in str(e):
-                                    # Agent was initialized with old code - reinitialize it
-                                    st.warning("🔄 Reloading agent with latest code...")
-                                    import importlib
-                                    import src.vacation_agent
-                                    importlib.reload(src.vacation_agent)
-                                    from src.vacation_agent import VacationAgent
-                                    st.session_state.agent = VacationAgent()
-                                    # Retry the request
-                                    result = st.session_state.agent.process_vacation_request(
-                                        employee_id=employee_id,
-                                        leave_type=leave_type,
-                                        start_date=start_date,
-                                        end_date=end_date,
-                                        is_manager=True
-                                    )
-                                else:
-                                    raise
+                            result = get_agent().process_vacation_request(
+                                employee_id=employee_id,
+                                leave_type=leave_type,
+                                start_date=start_date,
+                                end_date=end_date,
+                                is_manager=True
+                            )
                             st.session_state.request_result = result
                         else:
                             # Regular employee flow
@@ -713,7 +1082,7 @@ with col1:
                                 "message": f"Comparing requested {days_requested} days ({start_date.strftime('%b %d')} - {end_date.strftime('%b %d')}) against available balance..."
                             })
                             
-                            sufficient, balance_info = st.session_state.db.check_balance_sufficient(
+                            sufficient, balance_info = get_db().check_balance_sufficient(
                                 employee_id, days_requested, leave_type
                             )
                             
@@ -732,7 +1101,7 @@ with col1:
                                 "message": f"Checking policy compliance for {days_requested} days starting {start_date.strftime('%b %d, %Y')}..."
                             })
                             
-                            result = st.session_state.agent.process_vacation_request(
+                            result = get_agent().process_vacation_request(
                                 employee_id=employee_id,
                                 leave_type=leave_type,
                                 start_date=start_date,
@@ -762,7 +1131,9 @@ with col1:
                         st.session_state.form_start_date = start_date
                         st.session_state.form_end_date = end_date
                         
-                        st.rerun()
+                        load_employee_roster.clear()  # Manager requests are recorded immediately
+                        _balance.clear()
+                        st.rerun()  # Sidebar roster already rendered this run with the old balance
                         
                     except Exception as e:
                         st.error(f"Error processing request: {str(e)}")
@@ -773,35 +1144,286 @@ with col1:
 with col2:
     st.markdown('<div class="section-header">🔄 Processing Flow</div>', unsafe_allow_html=True)
     if st.session_state.processing_steps:
+        # Build every step into one buffer so the flow is a single markdown element
+        parts = []
+        last_index = len(st.session_state.processing_steps) - 1
         for i, step_info in enumerate(st.session_state.processing_steps):
             status_class = step_info.get("status", "")
-            icon_map = {
-                "processing": "⏳",
-                "completed": "✅",
-                "error": "❌"
-            }
-            icon = icon_map.get(status_class, "⚪")
+            icon = ICON_MAP.get(status_class, "⚪")
             
-            step_html = f"""
+            parts.append(f"""
             <div class="flow-step {status_class}">
                 <strong>{icon} Step {step_info['step']}: {step_info['name']}</strong><br>
                 <span style="color: #64748b; font-size: 0.9rem;">{step_info['message']}</span>
             </div>
-            """
-            st.markdown(step_html, unsafe_allow_html=True)
+            """)
             
             # Add connector if not last
-            if i < len(st.session_state.processing_steps) - 1:
-                st.markdown('<div class="flow-connector">↓</div>', unsafe_allow_html=True)
+            if i < last_index:
+                parts.append(FLOW_CONNECTOR_HTML)
+        st.markdown("".join(parts), unsafe_allow_html=True)
     else:
         st.info("Submit a request first to see the processing flow.")
 
+def _toggle_session_flag(key):
+    st.session_state[key] = not st.session_state.get(key, False)
+
+
+# Options panel: a fragment so option toggles rerun only this section
+@st.fragment
+def render_options_panel(result):
+    st.markdown('<div class="section-header">🎯 CHOOSE AN ACTION</div>', unsafe_allow_html=True)
+    
+    # Extract request details
+    employee_id = result.get("employee_id")
+    leave_type = result.get("leave_type")
+    start_date_str = result.get("requested_dates", {}).get("start")
+    end_date_str = result.get("requested_dates", {}).get("end")
+    days_requested = result.get("requested_dates", {}).get("days", 0)
+    balance_info = result.get("balance_info", {})
+    remaining_days = balance_info.get("remaining_days", 0)
+    remaining_hours = balance_info.get("remaining_hours", 0)
+    
+    if start_date_str and end_date_str:
+        start_date_obj = date.fromisoformat(start_date_str)
+        end_date_obj = date.fromisoformat(end_date_str)
+        # Format the display dates once; reused by the option panels and the approval message
+        s_md = start_date_obj.strftime('%B %d')
+        e_mdy = end_date_obj.strftime('%B %d, %Y')
+        
+        blocking_violations = result["_blocking_violations"]
+        
+        # Check if all checks passed (single pass, stops at the first failure)
+        all_checks_passed = True
+        has_failures = False
+        for check in result.get("analysis_checks", ()):
+            check_status = check.get("status")
+            if check_status == "FAIL":
+                has_failures = True
+                all_checks_passed = False
+                break
+            if check_status not in ("PASS", "INFO", "WARNING"):
+                all_checks_passed = False
+        
+        # Option panel markdown is cached on the request inputs, so unrelated reruns skip the formatting
+        options_md = render_options_html(
+            start_date_str, end_date_str, s_md, e_mdy, days_requested, remaining_days, remaining_hours,
+            all_checks_passed,
+            tuple((str(v.get('rule') or 'Policy Violation'), str(v.get('description') or '')) for v in blocking_violations)
+        )
+        
+        # One row of four option columns (B-D collapsed until opened) instead of a [3, 1] layout per option
+        st.markdown("---")
+        show_better = st.session_state.get("show_better_dates", False)
+        show_split = st.session_state.get("show_split_form", False)
+        option_d_label = "Option D: ❌ Deny with Explanation" if blocking_violations else "Option D: ❌ Deny Anyway (Manager Override)"
+        opt_a_col, opt_b_col, opt_c_col, opt_d_col = st.columns(4)
+        
+        # OPTION A: Approve Exactly as Requested
+        with opt_a_col:
+            st.markdown(options_md["a"])
+            if st.button("APPROVE THIS OPTION", key="opt_a_approve", use_container_width=True, 
+                       type="primary", disabled=(result.get("status") == "approved")):
+                try:
+                    updated_balance = get_db().record_leave_request(
+                        employee_id, leave_type, start_date_obj, end_date_obj, days_requested, "approved"
+                    )
+                    load_employee_roster.clear()
+                    _balance.clear()
+                    result["status"] = "approved"
+                    result["balance_info"] = updated_balance
+                    result["message"] = (
+                        f"✅ **APPROVED**: Your {leave_type} leave request for {days_requested} days "
+                        f"({s_md} to {e_mdy}) has been approved.\n\n"
+                        f"**Remaining Balance**: {updated_balance['remaining_days']:.1f} days "
+                        f"({updated_balance['remaining_hours']:.1f} hours) of {leave_type} leave remaining.\n"
+                    )
+                    st.session_state.request_result = result
+                    st.success("✅ **Request Approved!**")
+                    st.rerun()  # Full app: the status header and balance below depend on this
+                except Exception as e:
+                    st.error(f"Error: {str(e)}")
+        
+        # OPTION B: Suggest Better Dates
+        with opt_b_col:
+            with st.expander("Option B: 🔄 Suggest Better Dates", expanded=show_better):
+                st.markdown(options_md["b"])
+                # Toggled in a callback, so the fragment's own rerun already sees the new value
+                st.button("VIEW SUGGESTIONS", key="opt_b_suggestions", use_container_width=True,
+                          on_click=_toggle_session_flag, args=("show_better_dates",))
+                if show_better:
+                    st.markdown("**💡 Use these dates when submitting your next request**")
+        
+        # OPTION C: Split Request
+        with opt_c_col:
+            with st.expander("Option C: ✂️ Split Request", expanded=show_split):
+                st.markdown(options_md["c"])
+                st.button("SPLIT REQUEST", key="opt_c_split", use_container_width=True,
+                          on_click=_toggle_session_flag, args=("show_split_form",))
+        
+        # OPTION D: Deny with Explanation (labelled as a manager override when nothing blocks)
+        with opt_d_col:
+            with st.expander(option_d_label, expanded=False):
+                st.markdown(options_md["d"])
+                if st.button("DENY REQUEST", key="opt_d_deny", use_container_width=True,
+                           disabled=(result.get("status") == "denied")):
+                    try:
+                        get_db().record_leave_request(
+                            employee_id, leave_type, start_date_obj, end_date_obj, days_requested, "denied"
+                        )
+                        load_employee_roster.clear()  # The insert moved the DB mtime, i.e. the cache key
+                        result["status"] = "denied"
+                        if blocking_violations:
+                            result["message"] = "❌ **DENIED**: This request has been denied. See policy violations above for details."
+                        else:
+                            result["message"] = "❌ **DENIED**: This request has been denied with manager override (no policy violations detected)."
+                        st.session_state.request_result = result
+                        st.warning("❌ **Request Denied!**")
+                        st.rerun()  # Full app: the status header below depends on this
+                    except Exception as e:
+                        st.error(f"Error: {str(e)}")
+        
+        # Split form (fixed to prevent Streamlit error)
+        if show_split:
+            with st.form("split_request_form"):
+                original_days = float(days_requested)
+                balance_days = float(remaining_days)
+
+                # Fix: value must be <= max_value
+                default_val_1 = min(original_days / 2, original_days, balance_days)
+                default_val_1 = max(0.5, default_val_1)  # Ensure at least 0.5
+
+                split_col1, split_col2 = st.columns(2)
+                with split_col1:
+                    split_days_1 = st.number_input(
+                        "Segment 1 - Days", 
+                        min_value=0.5, 
+                        max_value=float(original_days), 
+                        value=default_val_1,
+                        step=0.5
+                    )
+                with split_col2:
+                    max_val_2 = float(original_days - split_days_1)
+                    default_val_2 = max(0.0, float(original_days - split_days_1))
+                    split_days_2 = st.number_input(
+                        "Segment 2 - Days", 
+                        min_value=0.0, 
+                        max_value=max_val_2 if max_val_2 > 0 else 0.5, 
+                        value=default_val_2,
+                        step=0.5
+                    )
+
+                if st.form_submit_button("🚀 Process Split Request", use_container_width=True):
+                    # Compare in integer tenths of a day so the 0.5 steps match exactly
+                    if round(split_days_1 * 10) + round(split_days_2 * 10) == round(original_days * 10):
+                        st.success(f"✅ Split request created: **Segment 1:** {split_days_1} days, **Segment 2:** {split_days_2} days")
+                        st.info("💡 You can now submit each segment as a separate request.")
+                        st.session_state.show_split_form = False
+                    else:
+                        st.error(f"❌ Total days ({split_days_1 + split_days_2:.1f}) must equal original request ({original_days} days)")
+        
+        st.markdown("---")
+
+
+# Send/Download/Copy plus the sent status: a nested fragment so these clicks leave the editor alone
+@st.fragment
+def _email_actions(edited_email, emp_tag, date_tag, leave_type_title):
+    _ss = st.session_state
+    # On a fragment-only rerun the argument is from the last editor run; the widget state is current
+    edited_email = _ss.get("email_editor", edited_email)
+    sent = _ss.get("email_sent_status")
+    col_send, col_download, col_copy = st.columns([2, 1, 1])
+
+    with col_send:
+        if st.button("📤 Send Email to Manager", use_container_width=True, type="primary"):
+            # Simulate sending email (in production, integrate with email service)
+            timestamp = _now().strftime(_FMT)
+            sent = _ss.email_sent_status = {
+                "status": "sent",
+                "timestamp": timestamp,
+                "email_content": edited_email
+            }
+            st.success("✅ Email sent successfully to manager!")
+            # Celebrate once per distinct email; re-sending the same draft for the same employee doesn't
+            balloon_key = hash((emp_tag, edited_email))
+            if _ss.get("_last_balloon_key") != balloon_key:
+                st.balloons()
+                _ss._last_balloon_key = balloon_key
+
+    with col_download:
+        st.download_button(
+            label="📥 Download",
+            data=lambda s=edited_email: s.encode("utf-8"),  # Deferred: built only when clicked
+            file_name=f"leave_request_email_{emp_tag}_{date_tag}.txt",
+            mime="text/plain",
+            use_container_width=True
+        )
+
+    with col_copy:
+        if st.button("📋 Copy", use_container_width=True, help="Copy email to clipboard"):
+            # The write happens in the component iframe, which the browser may refuse (no focus or
+            # user activation there), so the script reports its own outcome instead of a blind toast
+            payload = json.dumps(edited_email).replace("</", "<\\/")  # keep "</script>" in the text from closing the tag
+            components.html(
+                '<div id="s" style="font-family: sans-serif; font-size: 0.8rem; color: #64748b;"></div>'
+                # Promise.resolve() also routes a missing navigator.clipboard (non-HTTPS) into .catch
+                f"<script>Promise.resolve().then(() => navigator.clipboard.writeText({payload}))"
+                ".then(() => { document.getElementById('s').textContent = '✅ Copied to clipboard'; })"
+                ".catch(() => { document.getElementById('s').textContent = '⚠️ Clipboard blocked, use Download'; });"
+                "</script>",
+                height=30,
+            )
+
+    # Show sent status
+    if sent:
+        status_info = sent
+        if status_info.get("status") == "sent":
+            st.markdown("---")
+            with st.container(border=True):
+                st.markdown("### ✅ Email Sent Successfully")
+                st.markdown(f"""
+                **Status:** Sent to Manager  
+                **Timestamp:** {status_info.get('timestamp', 'N/A')}  
+                **Recipient:** Manager  
+                **Subject:** Leave Request - {leave_type_title} Leave
+                """)
+
+
+# Email preview/editor: a fragment so edits rerun only this block
+@st.fragment
+def _email_draft_fragment():
+    # Snapshot the session keys this block reads once per run
+    _ss = st.session_state
+    draft = _ss.get("employee_email_draft")
+    if draft:
+        # Filename and subject parts, looked up once per render
+        emp_tag = _ss.get('form_employee_id', 'EMP')
+        date_tag = (_ss.get('form_start_date') or date.today()).strftime('%Y%m%d')
+        leave_type_title = _ss.get('form_leave_type', 'vacation').title()
+        st.markdown("**📝 Generated Email Preview**")
+
+        # Editable email (using text_area for editing), framed by a native bordered container
+        with st.container(border=True):
+            edited_email = st.text_area(
+                "Edit your email:",
+                value=draft,
+                height=300,
+                key="email_editor"
+            )
+        _ss.employee_email_draft = edited_email
+
+        # Email actions
+        _email_actions(edited_email, emp_tag, date_tag, leave_type_title)
+
+
 # Full-width results section
 if st.session_state.request_result:
     st.markdown("---")
     
     result = st.session_state.request_result
     status = result.get("status", "unknown")
+    # Blocking (non-warning) violations, computed once and shared by the options panel and conflict cards
+    result["_blocking_violations"] = tuple(v for v in result.get("violations", ()) if v.get("type") != "warning")
     
     
     # NEW: Multi-Step Analysis Section (BEFORE approval/denial)
@@ -811,40 +1433,21 @@ if st.session_state.request_result:
         
         # Display each check with status indicators
         analysis_col1, analysis_col2 = st.columns([1, 1])
+        # Accumulate each column's cards and flush them with one st.html call per column
+        left_html, right_html = [], []
         
         for i, check in enumerate(result["analysis_checks"]):
-            col = analysis_col1 if i % 2 == 0 else analysis_col2
-            
-            with col:
-                status_color = {
-                    "PASS": "#10b981",
-                    "FAIL": "#ef4444",
-                    "WARNING": "#f59e0b",
-                    "INFO": "#3b82f6"
-                }.get(check.get("status", "INFO"), "#64748b")
-                
-                check_html = f"""
-                <div style="padding: 1rem; margin: 0.5rem 0; border-radius: 8px; 
-                           border-left: 4px solid {status_color}; background: #f8fafc;">
-                    <div style="display: flex; align-items: center; gap: 0.5rem; margin-bottom: 0.5rem;">
-                        <span style="font-size: 1.5rem;">{check.get('icon', '⚪')}</span>
-                        <strong style="color: {status_color};">{check.get('check', 'Check')}</strong>
-                        <span style="margin-left: auto; padding: 0.25rem 0.75rem; 
-                                    background: {status_color}; color: white; border-radius: 12px; 
-                                    font-size: 0.75rem; font-weight: bold;">
-                            {check.get('status', 'UNKNOWN')}
-                        </span>
-                    </div>
-                    <div style="color: #64748b; font-size: 0.9rem; margin-bottom: 0.25rem;">
-                        {check.get('message', '')}
-                    </div>
-                    <div style="color: #94a3b8; font-size: 0.85rem; font-style: italic;">
-                        {check.get('details', '')}
-                    </div>
-                    {f"<div style='color: #3b82f6; font-size: 0.8rem; margin-top: 0.25rem;'><strong>Policy:</strong> {check.get('section', '')}</div>" if check.get('section') else ''}
-                </div>
-                """
-                st.markdown(check_html, unsafe_allow_html=True)
+            col_html = left_html if i % 2 == 0 else right_html
+            col_html.append(render_check(
+                str(check.get("status") or ""), str(check.get("icon", "⚪")), str(check.get("check", "Check")),
+                str(check.get("message", "")), str(check.get("details", "")), str(check.get("section") or ""),
+            ))
+        
+        # Flex columns keep the card spacing the per-card elements used to get
+        with analysis_col1:
+            st.html(f'<div style="display: flex; flex-direction: column;">{"".join(left_html)}</div>')
+        with analysis_col2:
+            st.html(f'<div style="display: flex; flex-direction: column;">{"".join(right_html)}</div>')
     
     # NEW: Comprehensive Options Section with Working Buttons
     # Show options section AFTER analysis checks (moved outside if block to ensure it always shows)
@@ -852,256 +1455,7 @@ if st.session_state.request_result:
     should_show_options = (status == "pending" or (status not in ["approved", "denied"] and status != "unknown"))
     
     if should_show_options and result.get("requested_dates"):
-        st.markdown('<div class="section-header">🎯 CHOOSE AN ACTION</div>', unsafe_allow_html=True)
-        
-        # Extract request details
-        employee_id = result.get("employee_id")
-        leave_type = result.get("leave_type")
-        start_date_str = result.get("requested_dates", {}).get("start")
-        end_date_str = result.get("requested_dates", {}).get("end")
-        days_requested = result.get("requested_dates", {}).get("days", 0)
-        balance_info = result.get("balance_info", {})
-        remaining_days = balance_info.get("remaining_days", 0)
-        remaining_hours = balance_info.get("remaining_hours", 0)
-        
-        if start_date_str and end_date_str:
-            start_date_obj = datetime.strptime(start_date_str, "%Y-%m-%d").date()
-            end_date_obj = datetime.strptime(end_date_str, "%Y-%m-%d").date()
-            
-            # Calculate new balance if approved
-            new_remaining_days = max(0, remaining_days - days_requested)
-            new_remaining_hours = max(0, remaining_hours - (days_requested * 8))
-            
-            # Check if all checks passed
-            all_checks_passed = all(
-                check.get("status") == "PASS" or check.get("status") == "INFO" or check.get("status") == "WARNING"
-                for check in result.get("analysis_checks", [])
-            )
-            has_failures = any(
-                check.get("status") == "FAIL" for check in result.get("analysis_checks", [])
-            )
-            
-            # OPTION A: Approve Exactly as Requested
-            with st.container():
-                st.markdown("---")
-                opt_a_col1, opt_a_col2 = st.columns([3, 1])
-                with opt_a_col1:
-                    status_icon = "✅" if all_checks_passed else "⚠️"
-                    status_text = "All checks passed" if all_checks_passed else "Some warnings present"
-                    st.markdown(f"""
-                    **Option A: ✅ Approve Exactly as Requested**
-                    - **Status:** {status_icon} {status_text}
-                    - **Action:** Approve {days_requested:.1f} days from {start_date_obj.strftime('%B %d')} to {end_date_obj.strftime('%B %d, %Y')}
-                    - **New Balance:** {new_remaining_days:.1f} days ({new_remaining_hours:.1f} hours)
-                    - **Email:** Will be sent to manager
-                    """)
-                with opt_a_col2:
-                    if st.button("APPROVE THIS OPTION", key="opt_a_approve", use_container_width=True, 
-                               type="primary", disabled=(result.get("status") == "approved")):
-                        try:
-                            st.session_state.db.record_leave_request(
-                                employee_id, leave_type, start_date_obj, end_date_obj, days_requested, "approved"
-                            )
-                            updated_balance = st.session_state.db.get_remaining_balance(employee_id, leave_type)
-                            result["status"] = "approved"
-                            result["balance_info"] = updated_balance
-                            result["message"] = (
-                                f"✅ **APPROVED**: Your {leave_type} leave request for {days_requested} days "
-                                f"({start_date_obj.strftime('%B %d')} to {end_date_obj.strftime('%B %d, %Y')}) has been approved.\n\n"
-                                f"**Remaining Balance**: {updated_balance['remaining_days']:.1f} days "
-                                f"({updated_balance['remaining_hours']:.1f} hours) of {leave_type} leave remaining.\n"
-                            )
-                            st.session_state.request_result = result
-                            st.success("✅ **Request Approved!**")
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"Error: {str(e)}")
-                
-                # OPTION B: Suggest Better Dates
-                with st.container():
-                    st.markdown("---")
-                    opt_b_col1, opt_b_col2 = st.columns([3, 1])
-                    with opt_b_col1:
-                        # Generate actual alternative date suggestions
-                        alt_suggestions = []
-                        if days_requested > 7:
-                            # Suggest splitting into 2 parts
-                            part1_days = min(7.0, days_requested / 2)
-                            part1_end = start_date_obj + timedelta(days=int(part1_days) - 1)
-                            alt_suggestions.append({
-                                "dates": f"{start_date_obj.strftime('%b %d')} - {part1_end.strftime('%b %d, %Y')}",
-                                "days": part1_days,
-                                "benefit": "Complies with max 7-day consecutive limit"
-                            })
-                            
-                            part2_days = days_requested - part1_days
-                            part2_start = start_date_obj + timedelta(days=14)
-                            part2_end = part2_start + timedelta(days=int(part2_days) - 1)
-                            alt_suggestions.append({
-                                "dates": f"{part2_start.strftime('%b %d')} - {part2_end.strftime('%b %d, %Y')}",
-                                "days": part2_days,
-                                "benefit": "2 weeks later - better team coverage"
-                            })
-                        else:
-                            # Suggest shifting by 1 week
-                            shift_start = start_date_obj + timedelta(days=7)
-                            shift_end = end_date_obj + timedelta(days=7)
-                            alt_suggestions.append({
-                                "dates": f"{shift_start.strftime('%b %d')} - {shift_end.strftime('%b %d, %Y')}",
-                                "days": days_requested,
-                                "benefit": "1 week later - better team planning"
-                            })
-                            # Suggest shifting by 2 weeks
-                            shift_start2 = start_date_obj + timedelta(days=14)
-                            shift_end2 = end_date_obj + timedelta(days=14)
-                            alt_suggestions.append({
-                                "dates": f"{shift_start2.strftime('%b %d')} - {shift_end2.strftime('%b %d, %Y')}",
-                                "days": days_requested,
-                                "benefit": "2 weeks later - improved coverage"
-                            })
-                        
-                        suggestions_text = "\n".join([
-                            f"- **Suggestion {i+1}:** {sug['dates']} ({sug['days']:.1f} days) - {sug['benefit']}"
-                            for i, sug in enumerate(alt_suggestions)
-                        ])
-                        
-                        st.markdown(f"""
-                        **Option B: 🔄 Suggest Better Dates**
-                        - **Status:** ⚠️ Alternative suggestions
-                        {suggestions_text}
-                        - **New Balance:** Same {days_requested:.1f} days total
-                        """)
-                    with opt_b_col2:
-                        show_suggestions = st.session_state.get("show_better_dates", False)
-                        if st.button("VIEW SUGGESTIONS", key="opt_b_suggestions", use_container_width=True):
-                            st.session_state.show_better_dates = not show_suggestions
-                            st.rerun()
-                
-                        if st.session_state.get("show_better_dates", False):
-                            st.markdown("**💡 Use these dates when submitting your next request**")
-                
-                # OPTION C: Split Request
-                with st.container():
-                    st.markdown("---")
-                    opt_c_col1, opt_c_col2 = st.columns([3, 1])
-                    with opt_c_col1:
-                        # Fix split date calculations to ensure valid date ranges
-                        part1_days = int(days_requested / 2)  # Use integer days for clean splits
-                        if part1_days < 1:
-                            part1_days = 1
-                        part1_end = start_date_obj + timedelta(days=part1_days - 1)  # -1 because start date is included
-                        
-                        part2_days = days_requested - part1_days
-                        if part2_days < 1:
-                            part2_days = 1
-                            part1_days = days_requested - 1
-                            part1_end = start_date_obj + timedelta(days=part1_days - 1)
-                        
-                        part2_start = start_date_obj + timedelta(days=14)
-                        part2_end = part2_start + timedelta(days=part2_days - 1)
-                        
-                        st.markdown(f"""
-                        **Option C: ✂️ Split Request**
-                        - **Status:** ⚠️ For better team coverage
-                        - **Part 1:** {part1_days} days on {start_date_obj.strftime('%b %d')} - {part1_end.strftime('%b %d, %Y')}
-                        - **Part 2:** {part2_days} days on {part2_start.strftime('%b %d')} - {part2_end.strftime('%b %d, %Y')}
-                        - **Benefit:** Maintains team productivity
-                        """)
-                    with opt_c_col2:
-                        if st.button("SPLIT REQUEST", key="opt_c_split", use_container_width=True):
-                            st.session_state.show_split_form = not st.session_state.get("show_split_form", False)
-                            st.rerun()
-                
-                # Split form (fixed to prevent Streamlit error)
-                if st.session_state.get("show_split_form", False):
-                    with st.form("split_request_form"):
-                        original_days = float(days_requested)
-                        balance_days = float(remaining_days)
-                        
-                        # Fix: value must be <= max_value
-                        default_val_1 = min(original_days / 2, original_days, balance_days)
-                        default_val_1 = max(0.5, default_val_1)  # Ensure at least 0.5
-                        
-                        split_col1, split_col2 = st.columns(2)
-                        with split_col1:
-                            split_days_1 = st.number_input(
-                                "Segment 1 - Days", 
-                                min_value=0.5, 
-                                max_value=float(original_days), 
-                                value=default_val_1,
-                                step=0.5
-                            )
-                        with split_col2:
-                            max_val_2 = float(original_days - split_days_1)
-                            default_val_2 = max(0.0, float(original_days - split_days_1))
-                            split_days_2 = st.number_input(
-                                "Segment 2 - Days", 
-                                min_value=0.0, 
-                                max_value=max_val_2 if max_val_2 > 0 else 0.5, 
-                                value=default_val_2,
-                                step=0.5
-                            )
-                        
-                        if st.form_submit_button("🚀 Process Split Request", use_container_width=True):
-                            if abs(split_days_1 + split_days_2 - original_days) < 0.1:  # Allow small floating point differences
-                                st.success(f"✅ Split request created: **Segment 1:** {split_days_1} days, **Segment 2:** {split_days_2} days")
-                                st.info("💡 You can now submit each segment as a separate request.")
-                                st.session_state.show_split_form = False
-                            else:
-                                st.error(f"❌ Total days ({split_days_1 + split_days_2:.1f}) must equal original request ({original_days} days)")
-                
-                # OPTION D: Deny with Explanation (only show if there are blocking violations OR as override)
-                violations = result.get("violations", [])
-                blocking_violations = [v for v in violations if v.get("type") != "warning"]
-                
-                # Only show deny option if there are blocking violations, or make it an override option
-                if blocking_violations or True:  # Always show, but label differently
-                    with st.container():
-                        st.markdown("---")
-                        opt_d_col1, opt_d_col2 = st.columns([3, 1])
-                        with opt_d_col1:
-                            if blocking_violations:
-                                violation_text = "\n".join([
-                                    f"- {v.get('rule', 'Policy Violation')}: {v.get('description', '')}"
-                                    for v in blocking_violations[:2]
-                                ])
-                                policy_refs = ", ".join([v.get('rule', '').split('(')[1].split(')')[0] 
-                                                        for v in blocking_violations if '(' in v.get('rule', '')])[:1]
-                                suggestion_text = "Please review the policy violations above and adjust your request accordingly."
-                                
-                                st.markdown(f"""
-                                **Option D: ❌ Deny with Explanation**
-                                - **Status:** ❌ Policy violation detected
-                                {violation_text}
-                                - **Policy Reference:** {policy_refs}
-                                - **Suggestion:** {suggestion_text}
-                                """)
-                            else:
-                                st.markdown(f"""
-                                **Option D: ❌ Deny Anyway (Manager Override)**
-                                - **Status:** ⚠️ Override required (no policy violations)
-                                - **Note:** This request can be approved, but you may deny it with manager override
-                                - **Reason:** Please provide a reason for override when denying
-                                """)
-                        with opt_d_col2:
-                            if st.button("DENY REQUEST", key="opt_d_deny", use_container_width=True,
-                                       disabled=(result.get("status") == "denied")):
-                                try:
-                                    st.session_state.db.record_leave_request(
-                                        employee_id, leave_type, start_date_obj, end_date_obj, days_requested, "denied"
-                                    )
-                                    result["status"] = "denied"
-                                    if blocking_violations:
-                                        result["message"] = "❌ **DENIED**: This request has been denied. See policy violations above for details."
-                                    else:
-                                        result["message"] = "❌ **DENIED**: This request has been denied with manager override (no policy violations detected)."
-                                    st.session_state.request_result = result
-                                    st.warning("❌ **Request Denied!**")
-                                    st.rerun()
-                                except Exception as e:
-                                    st.error(f"Error: {str(e)}")
-            
-            st.markdown("---")
+        render_options_panel(result)
     
     # Status header (only show if actually approved or denied, not pending)
     if status == "approved":
@@ -1136,38 +1490,18 @@ if st.session_state.request_result:
         with col3:
             st.metric("Annual Quota", f"{result['balance_info']['annual_quota_days']} days", help="Total annual allowance")
     
-    # Conflict Resolution Section (for denied requests with policy citations)
-    if result.get("violations") and result.get("status") == "denied":
+    # Conflict Resolution Section (for denied requests with policy citations); a manager
+    # override of a warning-only request has no blocking cards, and st.html rejects ""
+    if result["_blocking_violations"] and result.get("status") == "denied":
         st.markdown('<div class="section-header">⚠️ Conflict Resolution</div>', unsafe_allow_html=True)
         st.warning("🚫 **Request Denied**: The following policy violations prevent approval. Review the conflicts and suggested alternatives below.")
         
-        for violation in result["violations"]:
-            if violation.get('type') != 'warning':  # Only show blocking violations
-                section = violation.get('rule', '').split('(')[1].split(')')[0] if '(' in violation.get('rule', '') else 'N/A'
-                violation_html = f"""
-                <div style="padding: 1.5rem; margin: 1rem 0; border-radius: 12px; 
-                           background: linear-gradient(135deg, #fee2e2 0%, #fecaca 100%);
-                           border-left: 5px solid #ef4444;">
-                    <div style="display: flex; align-items: start; gap: 1rem;">
-                        <span style="font-size: 2rem;">📌</span>
-                        <div style="flex: 1;">
-                            <strong style="color: #dc2626; font-size: 1.1rem;">
-                                {violation.get('rule', 'Policy Violation')}
-                            </strong>
-                            <div style="margin-top: 0.5rem; color: #64748b;">
-                                {violation.get('description', '')}
-                            </div>
-                            <div style="margin-top: 0.75rem; padding: 0.5rem; background: white; 
-                                       border-radius: 6px; border-left: 3px solid #3b82f6;">
-                                <strong style="color: #3b82f6;">Policy Reference:</strong> 
-                                <code style="background: #f1f5f9; padding: 0.2rem 0.5rem; 
-                                            border-radius: 4px; margin-left: 0.5rem;">{section}</code>
-                            </div>
-                        </div>
-                    </div>
-                </div>
-                """
-                st.markdown(violation_html, unsafe_allow_html=True)
+        # Only show blocking violations; st.html skips the markdown parser for static cards
+        violation_blocks = "".join(
+            render_violation(str(v.get('rule') or 'Policy Violation'), str(v.get('description') or ''))
+            for v in result["_blocking_violations"]
+        )
+        st.html(violation_blocks)
     
     # Policy Notices/Warnings (show for approved requests with recommendations)
     if result.get("violations") and result.get("status") == "approved":
@@ -1188,80 +1522,81 @@ if st.session_state.request_result:
         st.markdown('<div class="section-header">💡 Proactive Options</div>', unsafe_allow_html=True)
         st.info("🎯 **Choose an Option**: Select how you'd like to proceed. Each option addresses the policy conflicts differently.")
         
-        # Display options as interactive cards
-        options_per_row = 2
-        option_rows = [result["options"][i:i+options_per_row] for i in range(0, len(result["options"]), options_per_row)]
-        
-        for row_options in option_rows:
-            cols = st.columns(len(row_options))
-            for idx, option in enumerate(row_options):
-                with cols[idx]:
-                    # Handle both old string format and new dict format
-                    if isinstance(option, dict):
-                        option_letter = option.get("letter", "?")
-                        option_title = option.get("title", "Option")
-                        option_desc = option.get("description", "")
-                        option_cons = option.get("consequence", "")
-                        is_recommended = option.get("recommended", False)
-                        option_type = option.get("type", "modify")
-                    else:
-                        # Legacy string format
-                        option_letter = option.split(':')[0].split()[-1] if ':' in option else "?"
-                        option_title = f"Option {option_letter}"
-                        option_desc = option.split(':', 1)[1].strip() if ':' in option else option
-                        option_cons = ""
-                        is_recommended = False
-                        option_type = "modify"
-                    
-                    # Determine card styling
-                    card_color = {
-                        "approve": "#10b981",
-                        "reduce": "#3b82f6",
-                        "delay": "#f59e0b",
-                        "deny": "#ef4444",
-                        "modify": "#6366f1"
-                    }.get(option_type, "#64748b")
-                    
-                    recommended_badge = """
-                    <div style="position: absolute; top: 0.5rem; right: 0.5rem; 
-                               background: #f59e0b; color: white; padding: 0.25rem 0.75rem; 
-                               border-radius: 12px; font-size: 0.75rem; font-weight: bold;">
-                        ⭐ Recommended
-                    </div>
-                    """ if is_recommended else ""
-                    
-                    option_html = f"""
-                    <div style="position: relative; padding: 1.5rem; margin: 0.5rem 0; 
-                               border-radius: 12px; border: 2px solid {card_color}; 
-                               background: linear-gradient(135deg, #ffffff 0%, #f8fafc 100%);
-                               box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1);
-                               transition: transform 0.2s, box-shadow 0.2s;
-                               cursor: pointer;">
-                        {recommended_badge}
-                        <div style="display: flex; align-items: center; gap: 0.5rem; margin-bottom: 0.75rem;">
-                            <span style="font-size: 1.5rem; font-weight: bold; color: {card_color};">
-                                Option {option_letter}
-                            </span>
-                        </div>
-                        <div style="font-weight: 600; color: #1f2937; margin-bottom: 0.5rem; font-size: 1.05rem;">
-                            {option_title}
-                        </div>
-                        <div style="color: #64748b; font-size: 0.9rem; margin-bottom: 0.75rem;">
-                            {option_desc}
-                        </div>
-                        {f'<div style="padding: 0.5rem; background: #f1f5f9; border-radius: 6px; margin-top: 0.5rem; font-size: 0.85rem; color: #475569;"><strong>Consequence:</strong> {option_cons}</div>' if option_cons else ''}
-                    </div>
-                    """
-                    st.markdown(option_html, unsafe_allow_html=True)
-                    
-                    # Action button for each option
-                    button_label = "✅ Select This Option" if option_type != "deny" else "❌ Confirm Denial"
-                    button_type = "primary" if is_recommended else "secondary"
-                    if st.button(button_label, key=f"option_{option_letter}_{idx}", use_container_width=True, type=button_type if option_type != "deny" else "primary"):
-                        st.info(f"✅ **Selected: Option {option_letter}** - {option_title}")
-                        st.session_state.selected_option = option
-                        # Note: In a real implementation, this would trigger the actual action
-                        # For now, we just show feedback
+        # Normalize options: handle both old string format and new dict format
+        parsed_options = []
+        for option in result["options"]:
+            if isinstance(option, dict):
+                option_letter = option.get("letter", "?")
+                option_title = option.get("title", "Option")
+                option_desc = option.get("description", "")
+                option_cons = option.get("consequence", "")
+                is_recommended = option.get("recommended", False)
+                option_type = option.get("type", "modify")
+            else:
+                # Legacy string format
+                option_letter = option.split(':')[0].split()[-1] if ':' in option else "?"
+                option_title = f"Option {option_letter}"
+                option_desc = option.split(':', 1)[1].strip() if ':' in option else option
+                option_cons = ""
+                is_recommended = False
+                option_type = "modify"
+            parsed_options.append((option, option_letter, option_title, option_desc, option_cons, is_recommended, option_type))
+        
+        # Display all option cards in one two-column grid (a single markdown element)
+        cards_html = []
+        for _, option_letter, option_title, option_desc, option_cons, is_recommended, option_type in parsed_options:
+            # Determine card styling
+            card_color = CARD_COLORS.get(option_type, "#64748b")
+            
+            recommended_badge = """
+            <div style="position: absolute; top: 0.5rem; right: 0.5rem; 
+                       background: #f59e0b; color: white; padding: 0.25rem 0.75rem; 
+                       border-radius: 12px; font-size: 0.75rem; font-weight: bold;">
+                ⭐ Recommended
+            </div>
+            """ if is_recommended else ""
+            
+            option_html = f"""
+            <div style="position: relative; padding: 1.5rem; margin: 0.5rem 0; 
+                       border-radius: 12px; border: 2px solid {card_color}; 
+                       background: linear-gradient(135deg, #ffffff 0%, #f8fafc 100%);
+                       box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1);
+                       transition: transform 0.2s, box-shadow 0.2s;
+                       cursor: pointer;">
+                {recommended_badge}
+                <div style="display: flex; align-items: center; gap: 0.5rem; margin-bottom: 0.75rem;">
+                    <span style="font-size: 1.5rem; font-weight: bold; color: {card_color};">
+                        Option {option_letter}
+                    </span>
+                </div>
+                <div style="font-weight: 600; color: #1f2937; margin-bottom: 0.5rem; font-size: 1.05rem;">
+                    {option_title}
+                </div>
+                <div style="color: #64748b; font-size: 0.9rem; margin-bottom: 0.75rem;">
+                    {option_desc}
+                </div>
+                {f'<div style="padding: 0.5rem; background: #f1f5f9; border-radius: 6px; margin-top: 0.5rem; font-size: 0.85rem; color: #475569;"><strong>Consequence:</strong> {option_cons}</div>' if option_cons else ''}
+            </div>
+            """
+            cards_html.append(_compact_html(option_html))
+        st.markdown(
+            '<div style="display: grid; grid-template-columns: 1fr 1fr; gap: 1rem;">'
+            + "\n".join(cards_html)
+            + '</div>',
+            unsafe_allow_html=True
+        )
+        
+        # Action button for each option, in one row below the grid
+        cols = st.columns(len(parsed_options))
+        for idx, (option, option_letter, option_title, _, _, is_recommended, option_type) in enumerate(parsed_options):
+            with cols[idx]:
+                button_label = f"✅ Select Option {option_letter}" if option_type != "deny" else f"❌ Confirm Denial ({option_letter})"
+                button_type = "primary" if is_recommended else "secondary"
+                if st.button(button_label, key=f"option_{option_letter}_{idx}", use_container_width=True, type=button_type if option_type != "deny" else "primary"):
+                    st.info(f"✅ **Selected: Option {option_letter}** - {option_title}")
+                    st.session_state.selected_option = option
+                    # Note: In a real implementation, this would trigger the actual action
+                    # For now, we just show feedback
         
         st.markdown("---")
     
@@ -1295,99 +1630,45 @@ if st.session_state.request_result:
                     s_date = st.session_state.get("form_start_date", result.get("requested_dates", {}).get("start", date.today()))
                     e_date = st.session_state.get("form_end_date", result.get("requested_dates", {}).get("end", date.today()))
                     
-                    # Convert string dates if needed
+                    # Convert string dates if needed and store them back so later clicks skip the parse
                     if isinstance(s_date, str):
-                        s_date = datetime.strptime(s_date, "%Y-%m-%d").date()
+                        s_date = date.fromisoformat(s_date)
                     if isinstance(e_date, str):
-                        e_date = datetime.strptime(e_date, "%Y-%m-%d").date()
+                        e_date = date.fromisoformat(e_date)
+                    st.session_state.form_start_date = s_date
+                    st.session_state.form_end_date = e_date
                     
-                    employee_email = st.session_state.agent.generate_employee_email(
-                        employee_id=emp_id,
-                        leave_type=lv_type,
-                        start_date=s_date,
-                        end_date=e_date,
-                        days_requested=(e_date - s_date).days + 1,
-                        balance_info=result.get("balance_info", {}),
-                        custom_message=email_custom_message if email_custom_message else None
-                    )
-                    st.session_state.employee_email_draft = employee_email
-                    st.session_state.email_sent_status = None
-                    st.rerun()
+                    balance_key = tuple(sorted(result.get("balance_info", {}).items()))
+                    # Same inputs as the current draft: keep it (and any edits) instead of regenerating
+                    gen_key = (emp_id, lv_type, s_date.isoformat(), e_date.isoformat(),
+                               email_custom_message or "", balance_key)
+                    if st.session_state.get("_last_gen_key") != gen_key or not st.session_state.get("employee_email_draft"):
+                        employee_email = _gen_email(
+                            emp_id, lv_type, s_date.isoformat(), e_date.isoformat(),
+                            (e_date - s_date).days + 1,
+                            balance_key,
+                            email_custom_message if email_custom_message else None
+                        )
+                        st.session_state.employee_email_draft = employee_email
+                        st.session_state.email_sent_status = None
+                        st.session_state._last_gen_key = gen_key
                 except Exception as e:
                     st.error(f"Error generating email: {str(e)}")
     
     # Display generated email
-    if st.session_state.employee_email_draft:
-        st.markdown("**📝 Generated Email Preview**")
-        st.markdown('<div class="email-preview">', unsafe_allow_html=True)
-        
-        # Editable email (using text_area for editing)
-        edited_email = st.text_area(
-            "Edit your email:",
-            value=st.session_state.employee_email_draft,
-            height=300,
-            key="email_editor"
-        )
-        st.session_state.employee_email_draft = edited_email
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Email actions
-        col_send, col_download, col_copy = st.columns([2, 1, 1])
-        
-        with col_send:
-            if st.button("📤 Send Email to Manager", use_container_width=True, type="primary"):
-                # Simulate sending email (in production, integrate with email service)
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                st.session_state.email_sent_status = {
-                    "status": "sent",
-                    "timestamp": timestamp,
-                    "email_content": edited_email
-                }
-                st.success("✅ Email sent successfully to manager!")
-                st.balloons()
-                st.rerun()
-        
-        with col_download:
-            st.download_button(
-                label="📥 Download",
-                data=edited_email,
-                file_name=f"leave_request_email_{st.session_state.get('form_employee_id', 'EMP')}_{st.session_state.get('form_start_date', date.today()).strftime('%Y%m%d')}.txt",
-                mime="text/plain",
-                use_container_width=True
-            )
-        
-        with col_copy:
-            if st.button("📋 Copy", use_container_width=True, help="Copy email to clipboard"):
-                st.code(edited_email, language=None)
-                st.info("💡 Click the code block above and copy, or use the download button")
-        
-        # Show sent status
-        if st.session_state.email_sent_status:
-            status_info = st.session_state.email_sent_status
-            if status_info.get("status") == "sent":
-                st.markdown("---")
-                st.markdown('<div class="result-box approved-box">', unsafe_allow_html=True)
-                st.markdown("### ✅ Email Sent Successfully")
-                st.markdown(f"""
-                **Status:** Sent to Manager  
-                **Timestamp:** {status_info.get('timestamp', 'N/A')}  
-                **Recipient:** Manager  
-                **Subject:** Leave Request - {st.session_state.get('form_leave_type', 'vacation').title()} Leave
-                """)
-                st.markdown('</div>', unsafe_allow_html=True)
+    _email_draft_fragment()
     
     # Manager notification email (separate section)
     if result.get("email_content"):
         st.markdown("---")
         st.markdown('<div class="section-header">📧 Manager Notification Email (System Generated)</div>', unsafe_allow_html=True)
         st.info("This is the automated system notification sent to your manager. The email above is your personal request email.")
-        st.markdown('<div class="email-preview">', unsafe_allow_html=True)
-        st.text(result["email_content"])
-        st.markdown('</div>', unsafe_allow_html=True)
+        with st.container(border=True):
+            st.code(result["email_content"], language=None)
         
         st.download_button(
             label="📥 Download Manager Notification",
-            data=result["email_content"],
+            data=lambda s=result["email_content"]: s.encode("utf-8"),  # Deferred: built only when clicked
             file_name=f"manager_notification_{employee_id}_{start_date.strftime('%Y%m%d')}.txt",
             mime="text/plain",
             use_container_width=False
@@ -1396,8 +1677,15 @@ else:
     st.markdown("---")
     st.info("No active request. Submit a leave request to see results.")
 
-# Balance Query Modal
-if st.session_state.get("show_balance", False):
+# Modal flags, read once for both modals
+_ss = st.session_state
+show_balance_modal = _ss.get("show_balance", False)
+show_policy_modal = _ss.get("show_policy", False)
+
+
+# Balance Query Modal: a fragment so balance checks rerun only the modal
+@st.fragment
+def _balance_modal():
     st.markdown("---")
     with st.expander("💰 Balance Query", expanded=True):
         bal_employee_id = st.text_input("Employee ID", placeholder="e.g., EMP001", value="EMP001", key="bal_emp_id")
@@ -1405,17 +1693,23 @@ if st.session_state.get("show_balance", False):
         
         if st.button("Check Balance", key="check_balance_btn"):
             try:
-                balance_result = st.session_state.agent.query_balance(bal_employee_id, bal_leave_type)
+                balance_result = _balance(bal_employee_id, bal_leave_type)
                 st.success(balance_result["message"])
             except Exception as e:
                 st.error(f"Error: {str(e)}")
         
         if st.button("Close", key="close_balance"):
             st.session_state.show_balance = False
-            st.rerun()
+            st.rerun()  # Full app: the modal itself has to disappear
+
+
+if show_balance_modal:
+    _balance_modal()
 
-# Policy Search Modal
-if st.session_state.get("show_policy", False):
+
+# Policy Search Modal: a fragment so searching reruns only the modal
+@st.fragment
+def _policy_modal():
     st.markdown("---")
     with st.expander("📄 Corporate Leave Policy", expanded=True):
         policy_query = st.text_input("Search Policy", placeholder="e.g., 60% rule, blackout periods", key="policy_search")
@@ -1423,29 +1717,22 @@ if st.session_state.get("show_policy", False):
         if st.button("Search Policy", key="search_policy"):
             if policy_query:
                 try:
-                    explanation = st.session_state.agent.get_policy_explanation(policy_query)
+                    explanation = _policy_explain(policy_query)
                     st.markdown(explanation)
                 except Exception as e:
                     st.error(f"Error: {str(e)}")
         
         if st.button("Close", key="close_policy"):
             st.session_state.show_policy = False
-            st.rerun()
+            st.rerun()  # Full app: the modal itself has to disappear
         
         with st.expander("📋 Policy Highlights"):
-            st.markdown("""
-            - **60% Rule**: Cannot use >60% of annual allowance in single request
-            - **Frequency Limits**: Max 2 long vacations (>7 days) per 60-day period
-            - **Blackout Periods**: Restricted dates during fiscal quarters
-            - **Notice Period**: Minimum 2-week notice for leaves >3 days
-            """)
+            st.markdown(_POLICY_HIGHLIGHTS_MD)
+
+
+if show_policy_modal:
+    _policy_modal()
 
 # Enhanced Footer
 st.markdown("---")
-st.markdown(
-    '<div style="text-align: center; color: #94a3b8; padding: 2rem 0;">'
-    '<strong>Corporate Vacation AI Agent</strong> | Tool → RAG Integration | Built with Streamlit<br>'
-    '<small>© 2024 Corporate Leave Management System</small>'
-    '</div>',
-    unsafe_allow_html=True
-)
+st.markdown(_FOOTER_HTML, unsafe_allow_html=True)